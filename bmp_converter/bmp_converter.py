@@ -1,19 +1,82 @@
 import os
+import queue
 import threading
-from tkinter import Tk, filedialog, messagebox, StringVar, Label, Button, DISABLED, NORMAL
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tkinter import Tk, filedialog, messagebox, StringVar, IntVar, Label, Button, Frame, Spinbox, DISABLED, NORMAL
 from tkinter import ttk
 from PIL import Image
 
+
+def convert_image(bmp_path, output_path, output_format, overwrite):
+    """Convert one BMP; runs in a worker process. Returns None on success or the error message."""
+    try:
+        img = Image.open(bmp_path)
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+
+        save_format = 'JPEG' if output_format == 'jpg' else output_format.upper()
+        img.save(output_path, save_format)
+        img.close()
+
+        if overwrite:
+            os.remove(bmp_path)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def convert_folder(folder_path, output_format, overwrite, workers=None, results=None):
+    """Convert every BMP in folder_path over a process pool so encoding uses all cores.
+
+    Each finished file is reported to the results queue as ("result", filename, error),
+    with error None on success. Returns the number of images converted.
+    """
+    output_folder = folder_path if overwrite else os.path.join(folder_path, "output")
+    os.makedirs(output_folder, exist_ok=True)
+
+    bmp_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.bmp')]
+    count = 0
+    if not bmp_files:
+        return count
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = {}
+        for filename in bmp_files:
+            new_name = os.path.splitext(filename)[0] + f'.{output_format}'
+            future = executor.submit(convert_image, os.path.join(folder_path, filename),
+                                     os.path.join(output_folder, new_name), output_format, overwrite)
+            futures[future] = filename
+
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                error = future.result()
+            except Exception as e:  # the worker process itself died
+                error = str(e)
+            if error is None:
+                count += 1
+            else:
+                print(f"Failed to convert {filename}: {error}")
+            if results is not None:
+                results.put(("result", filename, error))
+    return count
+
+
 class ImageConverterApp:
     def __init__(self, root):
         self.root = root
         self.root.title("BMP Image Converter")
-        self.root.geometry('400x520')
+        self.root.geometry('400x560')
         self.root.resizable(False, False)
 
         self.folder_path = ""
         self.output_format = StringVar(value="jpg")
         self.overwrite = False
+        self.workers = IntVar(value=os.cpu_count() or 1)
+        self.results = queue.Queue()
+        self.total = 0
+        self.done = 0
 
         # Fonts
         font_title = ("Helvetica", 14, "bold")
@@ -37,6 +100,11 @@ class ImageConverterApp:
         self.output_button.pack(pady=2)
 
         Label(root, text="Step 4: Start Conversion", font=font_title).pack(pady=(20, 5))
+        workers_frame = Frame(root)
+        workers_frame.pack(pady=2)
+        Label(workers_frame, text="Workers:", font=font_normal).pack(side="left")
+        Spinbox(workers_frame, from_=1, to=max(64, os.cpu_count() or 1), textvariable=self.workers,
+                width=4, font=font_normal).pack(side="left", padx=5)
         self.start_button = Button(root, text="Start Converting", font=font_normal, width=20, command=self.start_conversion, state=DISABLED)
         self.start_button.pack(pady=5)
 
@@ -71,48 +139,52 @@ class ImageConverterApp:
         if not self.folder_path:
             messagebox.showerror("Error", "Please select a folder first.")
             return
-        threading.Thread(target=self.convert_images, daemon=True).start()
-
-    def convert_images(self):
-        folder_path = self.folder_path
-        output_format = self.output_format.get()
-        overwrite = self.overwrite
-
-        output_folder = folder_path if overwrite else os.path.join(folder_path, "output")
-        os.makedirs(output_folder, exist_ok=True)
-
-        bmp_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.bmp')]
-        total = len(bmp_files)
-        self.progress["maximum"] = total
+        try:
+            workers = max(1, self.workers.get())
+        except Exception:
+            workers = os.cpu_count() or 1
+
+        self.total = len([f for f in os.listdir(self.folder_path) if f.lower().endswith('.bmp')])
+        self.done = 0
+        self.progress["maximum"] = max(self.total, 1)
         self.progress["value"] = 0
-        count = 0
-
-        for idx, filename in enumerate(bmp_files, start=1):
-            bmp_path = os.path.join(folder_path, filename)
-            new_name = os.path.splitext(filename)[0] + f'.{output_format}'
-            output_path = os.path.join(output_folder, new_name)
-
-            try:
-                img = Image.open(bmp_path)
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-
-                save_format = 'JPEG' if output_format == 'jpg' else output_format.upper()
-                img.save(output_path, save_format)
-
-                if overwrite:
-                    os.remove(bmp_path)
-
-                count += 1
-                self.progress["value"] = count
-                self.status_label.config(text=f"⏳ Converting {idx}/{total} images...")
-                self.root.update_idletasks()
-
-            except Exception as e:
-                print(f"Failed to convert {filename}: {e}")
-
-        self.status_label.config(text=f"🎉 Conversion completed! {count} images converted.")
-        messagebox.showinfo("Done", f"Conversion completed! {count} images converted.")
+        self.status_label.config(text=f"⏳ Converting 0/{self.total} images...")
+        self.start_button.config(state=DISABLED)
+
+        # The thread only drives the process pool; Tk is updated from poll_results on the main thread
+        threading.Thread(target=self.convert_images, args=(workers,), daemon=True).start()
+        self.root.after(100, self.poll_results)
+
+    def convert_images(self, workers):
+        try:
+            count = convert_folder(self.folder_path, self.output_format.get(), self.overwrite,
+                                   workers=workers, results=self.results)
+            self.results.put(("done", count))
+        except Exception as e:
+            self.results.put(("error", str(e)))
+
+    def poll_results(self):
+        try:
+            while True:
+                message = self.results.get_nowait()
+                if message[0] == "result":
+                    self.done += 1
+                    self.progress["value"] = self.done
+                    self.status_label.config(text=f"⏳ Converting {self.done}/{self.total} images...")
+                elif message[0] == "done":
+                    count = message[1]
+                    self.start_button.config(state=NORMAL)
+                    self.status_label.config(text=f"🎉 Conversion completed! {count} images converted.")
+                    messagebox.showinfo("Done", f"Conversion completed! {count} images converted.")
+                    return
+                else:
+                    self.start_button.config(state=NORMAL)
+                    self.status_label.config(text="❌ Conversion failed.")
+                    messagebox.showerror("Error", message[1])
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self.poll_results)
 
 def main():
     root = Tk()
@@ -120,6 +192,7 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # needed for worker processes in a frozen Windows .exe
     main()
 
 
@@ -4,42 +4,290 @@ import subprocess
 import datetime
 import json
 import re
+import csv
+import struct
+import sqlite3
+import queue
+import itertools
+import threading
+import time
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from tkinter import filedialog, messagebox, ttk
 
+import numpy as np
 from openpyxl import Workbook
-from pyproj import Transformer
+from pyproj import CRS, Transformer
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it every file goes through exiftool
+    Image = None
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+DATETIME_ORIGINAL = 0x9003
+
+
+@lru_cache(maxsize=None)
+def get_transformer(source_crs="EPSG:4326", target_crs="EPSG:3826"):
+    """Build the WGS84 -> TWD97 pipeline once per process and share it between extractions."""
+    return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_exif_date(value):
+    """Parse an EXIF DateTimeOriginal; values that do not parse are returned unchanged."""
+    if not value:
+        return ""
+    try:
+        return datetime.datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+    except:
+        return value
+
+
+class ExifCache:
+    """Sidecar SQLite cache of extracted dates and TWD97 coordinates.
+
+    Entries are keyed by the path relative to the image folder, so the cache
+    keeps working when a NAS share is mounted elsewhere, and are only reused
+    while the file's size and mtime are unchanged.
+    """
+
+    FILE_NAME = ".exif2twd97_cache.sqlite"
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS exif_cache (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                lean INTEGER,
+                date TEXT,
+                x REAL,
+                y REAL
+            )
+        """)
+
+    @classmethod
+    def for_folder(cls, folder):
+        try:
+            return cls(os.path.join(folder, cls.FILE_NAME))
+        except sqlite3.Error:
+            return cls(":memory:")  # read-only folder: cache for this run only
+
+    def get(self, key, stat, lean):
+        """Return (date, x, y) if key was cached for this size, mtime and mode, else None."""
+        return self.conn.execute(
+            "SELECT date, x, y FROM exif_cache WHERE path = ? AND size = ? AND mtime_ns = ? AND lean = ?",
+            (key, stat.st_size, stat.st_mtime_ns, int(lean))
+        ).fetchone()
+
+    def put_many(self, entries):
+        """Store (key, size, mtime_ns, lean, date, x, y) tuples and commit."""
+        self.conn.executemany("REPLACE INTO exif_cache VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class ExifToolProcess:
+    """A long-lived exiftool in -stay_open mode; Perl starts once and then runs many batches."""
+
+    def __init__(self, exiftool_path, common_args=()):
+        self.process = subprocess.Popen(
+            [exiftool_path, "-stay_open", "True", "-@", "-", "-common_args", *common_args],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8"
+        )
+
+    def execute(self, args):
+        """Run one exiftool command and return its output up to the {ready} marker."""
+        for arg in args:
+            self.process.stdin.write(arg + "\n")
+        self.process.stdin.write("-execute\n")
+        self.process.stdin.flush()
+
+        output = []
+        for line in self.process.stdout:
+            if line.rstrip() == "{ready}":
+                return "".join(output)
+            output.append(line)
+        raise RuntimeError("EXIFTool exited unexpectedly.")
+
+    def close(self):
+        try:
+            self.process.stdin.write("-stay_open\nFalse\n")
+            self.process.stdin.flush()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.terminate()
+
+    def terminate(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
 
 
 class EXIFExtractor:
-    def __init__(self, exiftool_path):
+    # The only tags process_exif_row reads; lean mode asks exiftool for just these
+    LEAN_TAGS = ["DateTimeOriginal", "GPSLatitude", "GPSLatitudeRef", "GPSLongitude", "GPSLongitudeRef"]
+
+    # Types read in-process by Pillow; PNG and HEIC always go through exiftool
+    PILLOW_EXTENSIONS = {'.jpg', '.jpeg', '.tif', '.tiff'}
+
+    def __init__(self, exiftool_path, lean=True, workers=None, batch_size=200, use_pillow=True,
+                 cancel_event=None):
         self.exiftool_path = exiftool_path
-        self.transformer = Transformer.from_crs("EPSG:4326", "EPSG:3826", always_xy=True)
+        self.transformer = get_transformer()
         self.allowed_extensions = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.heic'}
+        self.use_pillow = use_pillow and Image is not None
+        self.lean = lean
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.cancel_event = cancel_event or threading.Event()
+
+    def exiftool_options(self):
+        options = ["-j", "-charset", "filename=utf8"]
+        if self.lean:
+            # Numeric output (decimal degrees, N/S refs), no scan for trailers
+            options += ["-n", "-fast2"] + [f"-{tag}" for tag in self.LEAN_TAGS]
+        return options
+
+    def iter_image_files(self, folder_path):
+        """Walk folder_path like exiftool -r (hidden folders skipped), yielding allowed image files."""
+        for root, dirs, files in os.walk(folder_path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in self.allowed_extensions:
+                    yield os.path.join(root, name)
+
+    def iter_exif_parallel(self, paths):
+        """Extract EXIF records for paths with self.workers persistent exiftool processes.
+
+        The paths are split into batches of self.batch_size; each worker thread
+        borrows an idle exiftool process per batch. Records come back in path order.
+        """
+        batches = [paths[i:i + self.batch_size] for i in range(0, len(paths), self.batch_size)]
+        if not batches:
+            return
+        idle = queue.Queue()
+        processes = [ExifToolProcess(self.exiftool_path, self.exiftool_options())
+                     for _ in range(min(self.workers, len(batches)))]
+        for process in processes:
+            idle.put(process)
+
+        def run_batch(batch):
+            if self.cancel_event.is_set():
+                return []
+            process = idle.get()
+            try:
+                output = process.execute(batch)
+            finally:
+                idle.put(process)
+            return json.loads(output) if output.strip() else []
 
-    def get_exif_batch(self, folder_path):
+        executor = ThreadPoolExecutor(max_workers=len(processes))
+        finished = False
         try:
-            result = subprocess.run(
-                [self.exiftool_path, "-j", "-r", folder_path],
-                capture_output=True,
-                text=True,
-                encoding="utf-8"
-            )
-            if result.stdout:
-                raw_data = json.loads(result.stdout)
-                return [item for item in raw_data
-                        if os.path.splitext(item.get("SourceFile", ""))[1].lower() in self.allowed_extensions]
-            return []
-        except json.JSONDecodeError:
-            print("❌ Could not parse EXIFTool output as JSON.")
-            return []
-        except Exception as e:
-            print(f"❌ Error reading EXIF: {e}")
-            return []
+            for future in [executor.submit(run_batch, batch) for batch in batches]:
+                records = self.wait_result(future)
+                if records is None:
+                    return
+                yield from records
+            finished = True
+        finally:
+            # A cancelled or abandoned run kills exiftool, so in-flight batches fail fast
+            for process in processes:
+                if finished:
+                    process.close()
+                else:
+                    process.terminate()
+            executor.shutdown(wait=True)
+
+    def wait_result(self, future):
+        """Wait for a batch future; None as soon as the run is cancelled."""
+        while not self.cancel_event.is_set():
+            try:
+                return future.result(timeout=0.2)
+            except FutureTimeoutError:
+                pass
+        return None
+
+    def read_exif_pillow(self, path):
+        """Read DateTimeOriginal and GPS of a JPEG / TIFF with Pillow.
+
+        Returns a record shaped like exiftool -n output, or None for other
+        types and files Pillow cannot parse.
+        """
+        if not self.use_pillow or os.path.splitext(path)[1].lower() not in self.PILLOW_EXTENSIONS:
+            return None
+        if self.cancel_event.is_set():
+            return None
+        try:
+            # Image.open only parses the header; getexif reads the APP1 / IFD entries
+            with Image.open(path) as img:
+                exif = img.getexif()
+                record = {"SourceFile": path}
+                date_value = exif.get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL)
+                if date_value:
+                    record["DateTimeOriginal"] = str(date_value).strip("\x00 ")
+                gps = exif.get_ifd(GPS_IFD)
+                if 2 in gps and 4 in gps:
+                    record["GPSLatitudeRef"] = str(gps.get(1, "N"))
+                    record["GPSLatitude"] = self.rational_to_degrees(gps[2])
+                    record["GPSLongitudeRef"] = str(gps.get(3, "E"))
+                    record["GPSLongitude"] = self.rational_to_degrees(gps[4])
+                return record
+        except Exception:
+            return None
+
+    def rational_to_degrees(self, value):
+        d, m, s = (float(part) for part in value)
+        degrees = d + m / 60 + s / 3600
+        return degrees if np.isfinite(degrees) else ""
+
+    def iter_exif_records(self, paths):
+        """Yield EXIF records for paths, read in-process where possible and by exiftool otherwise."""
+        fallback = []
+        if self.use_pillow:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for path, record in zip(paths, executor.map(self.read_exif_pillow, paths)):
+                    if self.cancel_event.is_set():
+                        return
+                    # No GPS IFD: exiftool may still find GPS in XMP, so ask it when available
+                    if record is None or ("GPSLatitude" not in record and self.exiftool_path):
+                        fallback.append(path)
+                    else:
+                        yield record
+        else:
+            fallback = list(paths)
+
+        # Without exiftool the remaining files just get no date / coordinates
+        if fallback and self.exiftool_path:
+            yield from self.iter_exif_parallel(fallback)
 
     def convert_to_degrees(self, value):
         try:
             if isinstance(value, str):
+                try:
+                    return float(value)  # already decimal degrees (exiftool -n)
+                except ValueError:
+                    pass
                 match = re.match(r"(\d+)[^\d]+(\d+)[^\d]+(\d+(?:\.\d+)?)", value)
                 if match:
                     d, m, s = map(float, match.groups())
@@ -50,60 +298,309 @@ class EXIFExtractor:
             pass
         return None
 
-    def process_exif_row(self, exif_data):
+    def decode_exif_row(self, exif_data):
+        """Return (date_value, lat, lon); lat / lon are None when the GPS tags are missing or unreadable."""
         lat_ref = exif_data.get("GPSLatitudeRef", "N")
         lon_ref = exif_data.get("GPSLongitudeRef", "E")
         lat = lon = None
         date_value = ""
 
         try:
-            value = exif_data.get("DateTimeOriginal", "")
-            if value:
-                try:
-                    date_value = datetime.datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
-                except:
-                    date_value = value
+            date_value = parse_exif_date(exif_data.get("DateTimeOriginal", ""))
         except:
             pass
 
         try:
             lat = self.convert_to_degrees(exif_data.get("GPSLatitude", ""))
             if lat_ref.upper().startswith("S"):
-                lat = -lat
+                lat = -abs(lat)  # numeric values may already carry the sign
         except:
             lat = None
 
         try:
             lon = self.convert_to_degrees(exif_data.get("GPSLongitude", ""))
             if lon_ref.upper().startswith("W"):
-                lon = -lon
+                lon = -abs(lon)
         except:
             lon = None
 
-        if lon is not None and lat is not None:
-            try:
-                x, y = self.transformer.transform(lon, lat)
-                return [date_value, round(x, 2), round(y, 2)]
-            except:
-                pass
-        return [date_value, "", ""]
+        return date_value, lat, lon
+
+    def process_exif_row(self, exif_data):
+        return self.process_exif_batch([exif_data])[0]
+
+    def process_exif_batch(self, records):
+        """Decode a batch of records and convert all their coordinates with one pyproj call."""
+        decoded = [self.decode_exif_row(item) for item in records]
+        lat = np.array([np.nan if row[1] is None else row[1] for row in decoded], dtype=float)
+        lon = np.array([np.nan if row[2] is None else row[2] for row in decoded], dtype=float)
+        # Missing GPS stays NaN; pyproj returns inf / NaN for it and for out-of-range input
+        x, y = self.transformer.transform(lon, lat)
+
+        rows = []
+        for (date_value, _, _), x_value, y_value in zip(decoded, np.atleast_1d(x), np.atleast_1d(y)):
+            if np.isfinite(x_value) and np.isfinite(y_value):
+                rows.append([date_value, round(float(x_value), 2), round(float(y_value), 2)])
+            else:
+                rows.append([date_value, "", ""])
+        return rows
+
+
+OUTPUT_HEADER = ["File Name", "DateTimeOriginal", "TWD97_X", "TWD97_Y"]
+TWD97_SRS_ID = 3826
+
+
+class OutputWriter:
+    """Streams result rows (file name, date, x, y) to output_file; x / y are None without GPS."""
 
+    def __init__(self, output_file):
+        self.output_file = output_file
 
-def extract_exif_to_excel(folder, output_file, exiftool_path):
-    extractor = EXIFExtractor(exiftool_path)
-    exif_data = extractor.get_exif_batch(folder)
+    def __enter__(self):
+        return self
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "EXIF Data"
-    ws.append(["File Name", "DateTimeOriginal", "TWD97_X", "TWD97_Y"])
+    def __exit__(self, *exc_info):
+        self.close()
 
-    for item in exif_data:
-        filename = os.path.basename(item.get("SourceFile", ""))
-        row = extractor.process_exif_row(item)
-        ws.append([filename] + row)
+    def format_date(self, value):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value
 
-    wb.save(output_file)
+    def write(self, file_name, date_value, x, y):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class XlsxWriter(OutputWriter):
+    def __init__(self, output_file):
+        super().__init__(output_file)
+        # write_only rows are serialized as they are appended instead of kept as cells
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("EXIF Data")
+        self.ws.append(OUTPUT_HEADER)
+
+    def write(self, file_name, date_value, x, y):
+        self.ws.append([file_name, date_value, "" if x is None else x, "" if y is None else y])
+
+    def close(self):
+        self.wb.save(self.output_file)
+
+
+class CsvWriter(OutputWriter):
+    def __init__(self, output_file):
+        super().__init__(output_file)
+        # BOM so Excel detects UTF-8 for Chinese file names
+        self.file = open(output_file, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(OUTPUT_HEADER)
+
+    def write(self, file_name, date_value, x, y):
+        self.writer.writerow([file_name, self.format_date(date_value),
+                              "" if x is None else x, "" if y is None else y])
+
+    def close(self):
+        self.file.close()
+
+
+class GeoJsonWriter(OutputWriter):
+    """GeoJSON FeatureCollection with TWD97 coordinates, named by the (pre RFC 7946) crs member."""
+
+    def __init__(self, output_file):
+        super().__init__(output_file)
+        self.file = open(output_file, "w", encoding="utf-8")
+        self.file.write('{"type": "FeatureCollection", '
+                        '"crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3826"}}, '
+                        '"features": [\n')
+        self.first = True
+
+    def write(self, file_name, date_value, x, y):
+        date_value = self.format_date(date_value)
+        feature = {
+            "type": "Feature",
+            "geometry": None if x is None else {"type": "Point", "coordinates": [x, y]},
+            "properties": {"file_name": file_name, "datetime_original": date_value or None,
+                           "twd97_x": x, "twd97_y": y},
+        }
+        if not self.first:
+            self.file.write(",\n")
+        self.file.write(json.dumps(feature, ensure_ascii=False))
+        self.first = False
+
+    def close(self):
+        self.file.write("\n]}\n")
+        self.file.close()
+
+
+class GeoPackageWriter(OutputWriter):
+    """GeoPackage point layer in EPSG:3826, written with sqlite3 alone."""
+
+    TABLE = "exif_points"
+
+    def __init__(self, output_file):
+        super().__init__(output_file)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        self.conn = sqlite3.connect(output_file)
+        self.bounds = None
+        self.create_schema()
+
+    def create_schema(self):
+        conn = self.conn
+        conn.execute("PRAGMA application_id = 1196444487")  # 'GPKG'
+        conn.execute("PRAGMA user_version = 10300")
+        conn.execute("""
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT
+            )
+        """)
+        conn.executemany("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+            ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+            ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None),
+            ("WGS 84 geodetic", 4326, "EPSG", 4326, CRS("EPSG:4326").to_wkt("WKT1_GDAL"), None),
+            ("TWD97 / TM2 zone 121", TWD97_SRS_ID, "EPSG", 3826, CRS("EPSG:3826").to_wkt("WKT1_GDAL"), None),
+        ])
+        conn.execute("""
+            CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+                description TEXT DEFAULT '', last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+                srs_id INTEGER REFERENCES gpkg_spatial_ref_sys(srs_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+                PRIMARY KEY (table_name, column_name)
+            )
+        """)
+        conn.execute(f"""
+            CREATE TABLE {self.TABLE} (
+                fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POINT, file_name TEXT,
+                datetime_original TEXT, twd97_x DOUBLE, twd97_y DOUBLE
+            )
+        """)
+        conn.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) VALUES (?, 'features', ?, ?)",
+                     (self.TABLE, self.TABLE, TWD97_SRS_ID))
+        conn.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', 'POINT', ?, 0, 0)",
+                     (self.TABLE, TWD97_SRS_ID))
+
+    def point_blob(self, x, y):
+        # GeoPackage binary header (magic, version 0, little endian, no envelope, srs id) + WKB point
+        return b"GP" + struct.pack("<BBi", 0, 1, TWD97_SRS_ID) + struct.pack("<BIdd", 1, 1, x, y)
+
+    def write(self, file_name, date_value, x, y):
+        date_value = self.format_date(date_value)
+        geom = None
+        if x is not None and y is not None:
+            geom = self.point_blob(x, y)
+            if self.bounds is None:
+                self.bounds = [x, y, x, y]
+            else:
+                self.bounds = [min(self.bounds[0], x), min(self.bounds[1], y),
+                               max(self.bounds[2], x), max(self.bounds[3], y)]
+        self.conn.execute(f"INSERT INTO {self.TABLE} (geom, file_name, datetime_original, twd97_x, twd97_y) "
+                          "VALUES (?, ?, ?, ?, ?)", (geom, file_name, date_value or None, x, y))
+
+    def close(self):
+        if self.bounds is not None:
+            self.conn.execute("UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ? WHERE table_name = ?",
+                              (*self.bounds, self.TABLE))
+        self.conn.commit()
+        self.conn.close()
+
+
+OUTPUT_WRITERS = {
+    ".xlsx": XlsxWriter,
+    ".csv": CsvWriter,
+    ".geojson": GeoJsonWriter,
+    ".gpkg": GeoPackageWriter,
+}
+
+
+def writer_class(output_file):
+    """Pick the output writer from the extension of output_file."""
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext not in OUTPUT_WRITERS:
+        raise ValueError(f"Unsupported output type: {ext or output_file} "
+                         f"(use {', '.join(OUTPUT_WRITERS)})")
+    return OUTPUT_WRITERS[ext]
+
+
+def open_writer(output_file):
+    return writer_class(output_file)(output_file)
+
+
+def extract_exif_to_excel(folder, output_file, exiftool_path, lean=True, workers=None, use_cache=True,
+                          use_pillow=True, progress=None, cancel_event=None):
+    """Extract dates and TWD97 coordinates of the images under folder into output_file.
+
+    The output format follows the extension: .xlsx, .csv, .geojson or .gpkg.
+    Rows are written as they become available: cached files first, then each
+    batch of newly read files as soon as it is processed. progress(done, total)
+    is called after every batch of files read; once cancel_event is set, reading
+    stops and the output keeps only the files read so far. Returns the number
+    of rows written.
+    """
+    writer_class(output_file)  # fail on a bad extension before reading any file
+    extractor = EXIFExtractor(exiftool_path, lean=lean, workers=workers, use_pillow=use_pillow,
+                              cancel_event=cancel_event)
+    paths = list(extractor.iter_image_files(folder))
+    cache = ExifCache.for_folder(folder) if use_cache else ExifCache(":memory:")
+
+    try:
+        # Only new or modified files are read; the rest come from the cache
+        stats = {path: os.stat(path) for path in paths}
+        keys = {path: os.path.relpath(path, folder) for path in paths}
+        cached = {path: cache.get(keys[path], stats[path], lean) for path in paths}
+        pending = [path for path in paths if cached[path] is None]
+        by_source = {os.path.normcase(os.path.normpath(path)): path for path in pending}
+
+        rows = 0
+        with open_writer(output_file) as writer:
+            def write_row(path, date, x, y):
+                nonlocal rows
+                writer.write(os.path.basename(path), parse_exif_date(date), x, y)
+                rows += 1
+
+            for path in paths:
+                if cached[path] is not None:
+                    write_row(path, *cached[path])
+
+            if progress:
+                progress(0, len(pending))
+            done = 0
+            written = set()
+            records = extractor.iter_exif_records(pending)
+            for batch in chunked(records, extractor.batch_size):
+                entries = []
+                for item, (_, x, y) in zip(batch, extractor.process_exif_batch(batch)):
+                    path = by_source.get(os.path.normcase(os.path.normpath(item.get("SourceFile", ""))))
+                    if path is None or path in written:
+                        continue
+                    entry = (keys[path], stats[path].st_size, stats[path].st_mtime_ns, int(lean),
+                             str(item.get("DateTimeOriginal", "")),
+                             None if x == "" else x, None if y == "" else y)
+                    entries.append(entry)
+                    write_row(path, *entry[4:])
+                    written.add(path)
+                cache.put_many(entries)
+                done += len(batch)
+                if progress:
+                    progress(done, len(pending))
+            records.close()
+
+            # Files no reader returned a record for still get an empty row, unless
+            # reading was cancelled before they were reached
+            if not extractor.cancel_event.is_set():
+                for path in pending:
+                    if path not in written:
+                        write_row(path, "", None, None)
+        return rows
+    finally:
+        cache.close()
 
 
 def open_file(path):
@@ -124,12 +621,15 @@ class EXIFtoExcelApp:
     def __init__(self, root):
         self.root = root
         self.root.title("EXIF2TWD97")
-        self.root.geometry("540x300")
+        self.root.geometry("540x380")
         self.root.resizable(False, False)
 
         self.exiftool_path = ""
         self.image_folder = ""
         self.output_path = tk.StringVar()
+        self.cancel_event = None
+        self.messages = queue.Queue()
+        self.started = 0.0
 
         self.build_gui()
 
@@ -140,23 +640,32 @@ class EXIFtoExcelApp:
         # EXIFTool selection
         tk.Label(frame, text="Step 0: Select EXIFTool Executable", font=("Segoe UI", 11, "bold")).pack(anchor="w")
         tk.Button(frame, text="Select EXIFTool", command=self.select_exiftool).pack(anchor="w")
-        self.exif_label = tk.Label(frame, text="Not selected", fg="gray")
+        self.exif_label = tk.Label(frame, text="Not selected (JPEG / TIFF are read without it)", fg="gray")
         self.exif_label.pack(anchor="w", pady=(0, 10))
 
         tk.Label(frame, text="Step 1: Select Image Folder", font=("Segoe UI", 11, "bold")).pack(anchor="w")
         tk.Button(frame, text="Choose Folder", command=self.select_folder).pack(anchor="w", pady=(0, 10))
 
-        tk.Label(frame, text="Step 2: Set Excel Output Path", font=("Segoe UI", 11, "bold")).pack(anchor="w")
+        tk.Label(frame, text="Step 2: Set Output Path", font=("Segoe UI", 11, "bold")).pack(anchor="w")
         path_frame = tk.Frame(frame)
         path_frame.pack(anchor="w", pady=5)
 
         tk.Entry(path_frame, textvariable=self.output_path, width=45).pack(side="left", padx=(0, 5))
         tk.Button(path_frame, text="Browse", command=self.select_output).pack(side="left", padx=(0, 5))
-        self.open_btn = tk.Button(path_frame, text="📂 Open Excel", command=self.open_excel, state="disabled")
+        self.open_btn = tk.Button(path_frame, text="📂 Open Output", command=self.open_excel, state="disabled")
         self.open_btn.pack(side="left")
 
-        self.extract_btn = tk.Button(frame, text="✅ Extract EXIF", command=self.extract)
-        self.extract_btn.pack(anchor="w")
+        button_frame = tk.Frame(frame)
+        button_frame.pack(anchor="w")
+        self.extract_btn = tk.Button(button_frame, text="✅ Extract EXIF", command=self.extract)
+        self.extract_btn.pack(side="left", padx=(0, 5))
+        self.cancel_btn = tk.Button(button_frame, text="⛔ Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.pack(side="left")
+
+        self.progress_bar = ttk.Progressbar(frame, length=480, mode="determinate")
+        self.progress_bar.pack(anchor="w", pady=(10, 0))
+        self.status_label = tk.Label(frame, text="", fg="gray")
+        self.status_label.pack(anchor="w")
 
     def select_exiftool(self):
         path = filedialog.askopenfilename(
@@ -177,7 +686,8 @@ class EXIFtoExcelApp:
     def select_output(self):
         path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
-            filetypes=[("Excel Files", "*.xlsx")],
+            filetypes=[("Excel Files", "*.xlsx"), ("CSV Files", "*.csv"),
+                       ("GeoJSON", "*.geojson"), ("GeoPackage", "*.gpkg")],
             title="Save as"
         )
         if path:
@@ -185,30 +695,98 @@ class EXIFtoExcelApp:
             self.open_btn.config(state="disabled")
 
     def extract(self):
-        if not self.exiftool_path or not os.path.exists(self.exiftool_path):
+        if self.exiftool_path and not os.path.exists(self.exiftool_path):
             messagebox.showerror("Error", "Please select a valid EXIFTool executable.")
             return
+        if not self.exiftool_path and Image is None:
+            messagebox.showerror("Error", "Please select an EXIFTool executable or install Pillow.")
+            return
         if not self.image_folder or not os.path.isdir(self.image_folder):
             messagebox.showerror("Error", "Please select a valid image folder.")
             return
         if not self.output_path.get():
-            messagebox.showerror("Error", "Please specify an Excel output path.")
+            messagebox.showerror("Error", "Please specify an output path.")
+            return
+        try:
+            writer_class(self.output_path.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
 
         self.extract_btn.config(text="⏳ Processing...", state="disabled")
-        self.root.update_idletasks()
+        self.cancel_btn.config(state="normal")
+        self.open_btn.config(state="disabled")
+        self.progress_bar.config(value=0, maximum=1)
+        self.status_label.config(text="Scanning folder...")
+        self.cancel_event = threading.Event()
+        self.started = time.monotonic()
+
+        # Tk is not thread-safe: the worker only posts messages, poll_worker applies them
+        threading.Thread(
+            target=self.run_extraction,
+            args=(self.image_folder, self.output_path.get(), self.exiftool_path, self.cancel_event),
+            daemon=True
+        ).start()
+        self.root.after(100, self.poll_worker)
+
+    def run_extraction(self, folder, output_file, exiftool_path, cancel_event):
+        try:
+            rows = extract_exif_to_excel(
+                folder, output_file, exiftool_path,
+                progress=lambda done, total: self.messages.put(("progress", done, total)),
+                cancel_event=cancel_event
+            )
+            self.messages.put(("done", rows, cancel_event.is_set()))
+        except Exception as e:
+            self.messages.put(("error", str(e)))
 
+    def poll_worker(self):
         try:
-            extract_exif_to_excel(self.image_folder, self.output_path.get(), self.exiftool_path)
+            while True:
+                message = self.messages.get_nowait()
+                if message[0] == "progress":
+                    self.show_progress(*message[1:])
+                else:
+                    self.finish(message)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self.poll_worker)
+
+    def show_progress(self, done, total):
+        self.progress_bar.config(value=done, maximum=max(total, 1))
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed > 0 else 0
+        text = f"{done} / {total} files"
+        if rate > 0:
+            eta = int((total - done) / rate)
+            text += f"  ·  {rate:.1f} files/s  ·  ETA {eta // 60}:{eta % 60:02d}"
+        self.status_label.config(text=text)
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state="disabled")
+            self.status_label.config(text="Cancelling, saving partial results...")
+
+    def finish(self, message):
+        self.cancel_btn.config(state="disabled")
+        if message[0] == "error":
+            self.extract_btn.config(text="❌ Error", state="normal")
+            self.status_label.config(text="")
+            messagebox.showerror("Error", message[1])
+        else:
+            _, rows, cancelled = message
             self.extract_btn.config(text="✅ Done", state="normal")
             self.open_btn.config(state="normal")
-            messagebox.showinfo("Done", f"Data saved to:\n{self.output_path.get()}")
-            # 2秒後恢復原本按鈕狀態
-            self.root.after(2000, lambda: self.extract_btn.config(text="✅ Extract EXIF", state="normal"))
-        except Exception as e:
-            self.extract_btn.config(text="❌ Error", state="normal")
-            messagebox.showerror("Error", str(e))
-            self.root.after(2000, lambda: self.extract_btn.config(text="✅ Extract EXIF", state="normal"))
+            if cancelled:
+                self.status_label.config(text=f"Cancelled, {rows} files saved")
+                messagebox.showinfo("Cancelled", f"Partial results ({rows} files) saved to:\n{self.output_path.get()}")
+            else:
+                self.status_label.config(text=f"{rows} files saved")
+                messagebox.showinfo("Done", f"Data saved to:\n{self.output_path.get()}")
+        # 2秒後恢復原本按鈕狀態
+        self.root.after(2000, lambda: self.extract_btn.config(text="✅ Extract EXIF", state="normal"))
 
     def open_excel(self):
         open_file(self.output_path.get())
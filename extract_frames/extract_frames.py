@@ -1,53 +1,511 @@
 import cv2
+import numpy as np
 import os
-from PIL import Image
+import sys
+import csv
+import json
+import glob
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from tkinter import Tk, filedialog
 
-def extract_frames(video_path, output_folder="output", frames_to_extract=None):
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".m4v")
+SUMMARY_FIELDS = ["video", "output", "status", "saved", "frames", "seconds", "fps"]
+STRATEGIES = ("count", "interval", "scene")
+
+# 每部影片輸出資料夾中的續傳紀錄；每儲存 MANIFEST_SAVE_EVERY 張更新一次
+MANIFEST_NAME = "manifest.json"
+MANIFEST_SAVE_EVERY = 50
+SKIPPED_STATUS = "已完成，略過"
+
+# 縮圖總覽：最多取 CONTACT_SHEET_MAX 張平均分布的影格，每列 CONTACT_SHEET_COLUMNS 張
+CONTACT_SHEET_NAME = "contact_sheet.jpg"
+CONTACT_SHEET_MAX = 100
+CONTACT_SHEET_COLUMNS = 10
+CONTACT_SHEET_THUMB_WIDTH = 320
+
+# 場景變化偵測所用的灰階縮圖大小；先以最近鄰取樣到 4 倍大小再區域平均，
+# 4K 影格直接 INTER_AREA 縮圖的時間與解碼相當
+SCENE_THUMB_SIZE = (64, 36)
+SCENE_SAMPLE_SIZE = (SCENE_THUMB_SIZE[0] * 4, SCENE_THUMB_SIZE[1] * 4)
+
+# 非精確模式下，間距超過此影格數才以 CAP_PROP_POS_FRAMES 跳轉，否則用 grab() 略過
+SEEK_MIN_GAP = 300
+
+
+def iter_selected_frames(cap, selected_frames, accurate=True):
+    """依序產生 (影格編號, 影格)，只解出選取的影格。
+
+    未選取的影格以 grab() 略過，不做 retrieve() 的色彩轉換與複製；
+    accurate=False 時，遇到長間距改以 CAP_PROP_POS_FRAMES 直接跳轉（依關鍵影格定位，
+    部分編碼格式可能落在目標附近的影格），擷取時間只與選取數量有關，與影片長度無關。
+    """
+    position = 0
+    for target in sorted(selected_frames):
+        if not accurate and target - position > SEEK_MIN_GAP:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = target
+        while position < target:
+            if not cap.grab():
+                return
+            position += 1
+        ret, frame = cap.read()
+        if not ret:
+            return
+        position += 1
+        yield target, frame
+
+
+def iter_interval_frames(cap, interval):
+    """每隔 interval 秒取一格。
+
+    依影格時間戳（CAP_PROP_POS_MSEC）判斷，不依賴常不準確的 CAP_PROP_FRAME_COUNT，
+    可變幀率（VFR）的手機影片也能均勻取樣；未選取的影格只 grab() 不 retrieve()。
+    """
+    frame_idx = 0
+    next_msec = 0.0
+    while cap.grab():
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if msec >= next_msec:
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+            yield frame_idx, frame
+            while next_msec <= msec:
+                next_msec += interval * 1000
+        frame_idx += 1
+
+
+def iter_scene_frames(cap, threshold=30.0):
+    """場景變化取樣：與上一張取出影格相比，灰階縮圖平均差異超過 threshold（0–255）即取格。
+
+    比較只在 SCENE_THUMB_SIZE 的縮圖上進行，成本遠小於解碼本身；
+    與上一張「取出」的影格比較，緩慢平移的空拍畫面累積到足夠變化時也會取格。
+    """
+    frame_idx = 0
+    last_thumb = None
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        sample = cv2.resize(frame, SCENE_SAMPLE_SIZE, interpolation=cv2.INTER_NEAREST)
+        thumb = cv2.cvtColor(cv2.resize(sample, SCENE_THUMB_SIZE, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        if last_thumb is None or cv2.norm(thumb, last_thumb, cv2.NORM_L1) / thumb.size > threshold:
+            last_thumb = thumb
+            yield frame_idx, frame
+        frame_idx += 1
+
+
+def positive_float(text):
+    """argparse 用：大於 0 的浮點數。"""
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("須為大於 0 的數字")
+    if value <= 0:
+        raise argparse.ArgumentTypeError("須為大於 0 的數字")
+    return value
+
+
+def parse_crop(text):
+    """將 "x,y,w,h" 轉為裁切範圍 (x, y, w, h)。"""
+    try:
+        x, y, w, h = (int(value) for value in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("裁切範圍格式為 x,y,w,h")
+    if x < 0 or y < 0 or w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError("裁切範圍格式為 x,y,w,h")
+    return x, y, w, h
+
+
+def transform_frame(frame, crop=None, max_size=None):
+    """解碼後立即裁切並以 INTER_AREA 縮小，後續編碼與寫檔只處理較小的影像。"""
+    if crop is not None:
+        x, y, w, h = crop
+        frame = frame[y:y + h, x:x + w]
+        if frame.size == 0:
+            raise ValueError(f"裁切範圍超出影格：{crop}")
+    if max_size:
+        height, width = frame.shape[:2]
+        scale = max_size / max(height, width)
+        if scale < 1:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if crop is not None:
+        frame = frame.copy()  # 不保留整張原始影格在寫入佇列中
+    return frame
+
+
+def read_image(path):
+    # np.fromfile + imdecode：Windows 上含中文的路徑也能讀取
+    return cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def write_contact_sheet(path, frames):
+    """將 (影格編號, 檔案路徑) 排成縮圖網格，存為 JPEG 供快速檢視。"""
+    if len(frames) > CONTACT_SHEET_MAX:
+        frames = [frames[int(i * len(frames) / CONTACT_SHEET_MAX)] for i in range(CONTACT_SHEET_MAX)]
+    thumbs = []
+    for frame_idx, filename in frames:
+        image = read_image(filename)
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        thumb_height = max(1, round(height * CONTACT_SHEET_THUMB_WIDTH / width))
+        thumb = cv2.resize(image, (CONTACT_SHEET_THUMB_WIDTH, thumb_height), interpolation=cv2.INTER_AREA)
+        cv2.putText(thumb, str(frame_idx), (8, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 4)
+        cv2.putText(thumb, str(frame_idx), (8, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        thumbs.append(thumb)
+    if not thumbs:
+        return
+
+    thumb_height = max(thumb.shape[0] for thumb in thumbs)
+    columns = min(CONTACT_SHEET_COLUMNS, len(thumbs))
+    rows = -(-len(thumbs) // columns)
+    sheet = np.zeros((rows * thumb_height, columns * CONTACT_SHEET_THUMB_WIDTH, 3), dtype=np.uint8)
+    for i, thumb in enumerate(thumbs):
+        top = (i // columns) * thumb_height
+        left = (i % columns) * CONTACT_SHEET_THUMB_WIDTH
+        sheet[top:top + thumb.shape[0], left:left + thumb.shape[1]] = thumb
+
+    ok, buffer = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    if ok:
+        with open(path, "wb") as f:
+            f.write(buffer.tobytes())
+
+
+def encode_params(image_format, quality=None, png_compression=3):
+    """回傳 (副檔名, cv2.imencode 參數)。"""
+    image_format = image_format.lower().lstrip(".")
+    if image_format == "png":
+        return ".png", [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    if image_format in ("jpg", "jpeg"):
+        return ".jpg", [cv2.IMWRITE_JPEG_QUALITY, 95 if quality is None else quality]
+    if image_format == "webp":
+        return ".webp", [cv2.IMWRITE_WEBP_QUALITY, 90 if quality is None else quality]
+    raise ValueError(f"不支援的影像格式：{image_format}")
+
+
+class FrameWriter:
+    """以執行緒池編碼並寫入影格，解碼不必等待壓縮。
+
+    直接以 cv2 編碼 BGR 影格（免 cvtColor 與 PIL 轉換，編碼時會釋放 GIL）；
+    排隊中的影格數以 max_pending 為上限，滿載時 submit() 會等待，記憶體用量固定。
+    """
+
+    def __init__(self, image_format="png", quality=None, png_compression=3, workers=None, max_pending=None):
+        self.ext, self.params = encode_params(image_format, quality, png_compression)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 2)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.errors = []
+        self.completed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, frame, filename):
+        ok, buffer = cv2.imencode(self.ext, frame, self.params)
+        if not ok:
+            raise RuntimeError(f"影格編碼失敗：{filename}")
+        # 以 Python 寫檔，Windows 上含中文的路徑也能正常儲存
+        with open(filename, "wb") as f:
+            f.write(buffer.tobytes())
+
+    def submit(self, frame, filename, key=None):
+        """排入一張影格；寫入成功後 key 會加入 self.completed。"""
+        self.slots.acquire()
+        future = self.executor.submit(self.write, frame, filename)
+        future.add_done_callback(lambda future: self.on_done(future, key))
+
+    def on_done(self, future, key):
+        self.slots.release()
+        if future.exception() is not None:
+            self.errors.append(future.exception())
+        elif key is not None:
+            self.completed.append(key)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.errors:
+            raise self.errors[0]
+
+
+def video_source_info(video_path):
+    stat = os.stat(video_path)
+    return {"source": os.path.abspath(video_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_manifest(path, source, params):
+    """讀取續傳紀錄；影片或擷取參數不同時視為重新開始。"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"saved": [], "complete": False}
+    if manifest.get("video") != source or manifest.get("params") != params:
+        return {"saved": [], "complete": False}
+    return manifest
+
+
+def save_manifest(path, source, params, saved, complete):
+    manifest = {"video": source, "params": params, "saved": sorted(saved), "complete": complete}
+    # 先寫暫存檔再取代，中斷時不會留下寫一半的紀錄
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def extract_frames(video_path, output_folder="output", frames_to_extract=None, accurate=True,
+                   image_format="png", quality=None, png_compression=3, workers=None, verbose=True,
+                   strategy="count", interval=1.0, scene_threshold=30.0,
+                   crop=None, max_size=None, contact_sheet=False, save_name=None):
+    """擷取影格並回傳摘要 dict（欄位見 SUMMARY_FIELDS）。
+
+    strategy："count" 平均取 frames_to_extract 張、"interval" 每 interval 秒一張、
+    "scene" 場景變化超過 scene_threshold 時取格；皆只讀取影片一次。
+    輸出資料夾中的 manifest.json 記錄已儲存的影格，重新執行時只補上缺少的影格。
+    crop=(x, y, w, h) 與 max_size（最長邊像素）在解碼後立即套用；
+    contact_sheet=True 時另存縮圖總覽 contact_sheet.jpg。
+    影格存於 output_folder/save_name，未指定 save_name 時為影片檔名（不含副檔名）。
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"不支援的取樣方式：{strategy}")
+    if strategy == "interval" and not interval > 0:
+        raise ValueError(f"取樣間隔須大於 0 秒：{interval}")
+    started = time.perf_counter()
     video_name = os.path.splitext(os.path.basename(video_path))[0]
-    save_dir = os.path.join(output_folder, video_name)
+    save_dir = os.path.join(output_folder, save_name or video_name)
+    summary = {"video": video_path, "output": save_dir, "status": "ok", "saved": 0, "frames": 0,
+               "seconds": 0.0, "fps": 0.0}
     os.makedirs(save_dir, exist_ok=True)
 
+    ext = encode_params(image_format, quality, png_compression)[0]
+    params = {"strategy": strategy, "frames_to_extract": frames_to_extract, "accurate": accurate,
+              "interval": interval, "scene_threshold": scene_threshold, "image_format": ext,
+              "quality": quality, "png_compression": png_compression,
+              "crop": list(crop) if crop else None, "max_size": max_size}
+    manifest_path = os.path.join(save_dir, MANIFEST_NAME)
+    source = video_source_info(video_path)
+    manifest = load_manifest(manifest_path, source, params)
+
+    def frame_filename(frame_idx):
+        return os.path.join(save_dir, f"{video_name}_{frame_idx:05d}{ext}")
+
+    contact_sheet_path = os.path.join(save_dir, CONTACT_SHEET_NAME)
+
+    done = {frame_idx for frame_idx in manifest["saved"] if os.path.exists(frame_filename(frame_idx))}
+    # 已完成且影格檔都還在才略過；有影格被刪除時照常續傳補齊
+    if manifest["complete"] and len(done) == len(manifest["saved"]):
+        if verbose:
+            print(f"⏭️ 已擷取完成，略過：{video_path}")
+        if contact_sheet and not os.path.exists(contact_sheet_path):
+            write_contact_sheet(contact_sheet_path,
+                                [(frame_idx, frame_filename(frame_idx)) for frame_idx in manifest["saved"]])
+        summary["status"] = SKIPPED_STATUS
+        return summary
+    if done and verbose:
+        print(f"⏩ 續傳：略過已儲存的 {len(done)} 張影格")
+
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print(f"❌ 無法開啟影片：{video_path}")
-        return
+        summary["status"] = "無法開啟影片"
+        return summary
 
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if total_frames == 0:
+    if strategy == "count" and total_frames == 0:
         print(f"⚠️ 無影格：{video_path}")
-        return
+        summary["status"] = "無影格"
+        return summary
 
-    print(f"🎞️ {video_path} - 總影格數: {total_frames}")
+    if verbose:
+        print(f"🎞️ {video_path} - 總影格數: {total_frames}")
 
-    if frames_to_extract is None or frames_to_extract >= total_frames:
-        selected_frames = set(range(total_frames))
+    if strategy == "interval":
+        frames = iter_interval_frames(cap, interval)
+    elif strategy == "scene":
+        frames = iter_scene_frames(cap, scene_threshold)
     else:
-        selected_frames = set(int(i * total_frames / frames_to_extract) for i in range(frames_to_extract))
+        if frames_to_extract is None or frames_to_extract >= total_frames:
+            selected_frames = set(range(total_frames))
+        else:
+            selected_frames = set(int(i * total_frames / frames_to_extract) for i in range(frames_to_extract))
+        # 續傳時已儲存的影格不再解出；非精確模式會直接跳轉到第一張缺少的影格，
+        # 精確模式則從頭 grab() 前進（跳轉可能落在目標附近的影格，會以錯誤影格補上缺少的編號）
+        frames = iter_selected_frames(cap, selected_frames - done, accurate)
 
-    frame_idx = 0
     saved_count = 0
+    complete = False
+    writer = FrameWriter(image_format, quality, png_compression, workers)
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        if frame_idx in selected_frames:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(frame_rgb)
-            filename = os.path.join(save_dir, f"{video_name}_{frame_idx:05d}.png")
-            image.save(filename)
-            saved_count += 1
-            print(f"✅ 儲存影格 {frame_idx} 至 {filename}")
+    try:
+        with writer:
+            for frame_idx, frame in frames:
+                if frame_idx in done:
+                    continue  # interval / scene 需逐格判斷，但已存在的影格不再編碼
+                filename = frame_filename(frame_idx)
+                writer.submit(transform_frame(frame, crop, max_size), filename, frame_idx)
+                saved_count += 1
+                if verbose:
+                    print(f"✅ 儲存影格 {frame_idx} 至 {filename}")
+                if saved_count % MANIFEST_SAVE_EVERY == 0:
+                    save_manifest(manifest_path, source, params, done.union(writer.completed), False)
+        complete = True
+    finally:
+        # 中斷或寫入失敗時也保留已完成的影格，下次從缺少的影格繼續
+        save_manifest(manifest_path, source, params, done.union(writer.completed), complete)
 
-        frame_idx += 1
+    if contact_sheet:
+        write_contact_sheet(contact_sheet_path,
+                            [(frame_idx, frame_filename(frame_idx)) for frame_idx in sorted(done.union(writer.completed))])
 
+    # 含以 grab() 略過的影格，即實際走過的影片長度
+    frames = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
     cap.release()
-    print(f"🎉 完成：{video_path} → 共儲存 {saved_count} 張影格\n")
+    seconds = time.perf_counter() - started
+    summary.update(saved=saved_count, frames=frames, seconds=round(seconds, 2),
+                   fps=round(frames / seconds, 1) if seconds > 0 else 0.0)
+    if verbose:
+        print(f"🎉 完成：{video_path} → 共儲存 {saved_count} 張影格\n")
+    return summary
 
 
-if __name__ == "__main__":
+def find_videos(sources):
+    """展開資料夾（遞迴）與萬用字元路徑，回傳排序後的影片清單。"""
+    videos = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                videos.update(os.path.join(root, name) for name in files
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(videos)
+
+
+def output_names(videos):
+    """回傳 {影片: 輸出子資料夾}，為影片相對於所有影片共同上層資料夾的路徑（不含副檔名）。
+
+    空拍機每天的資料夾會重複使用檔名（day1/DJI_0001.mp4、day2/DJI_0001.mp4），
+    只用檔名會寫進同一個資料夾互相覆蓋；同資料夾中只差副檔名的影片再加上副檔名區分。
+    """
+    folders = [os.path.dirname(os.path.abspath(video)) for video in videos]
+    try:
+        root = os.path.commonpath(folders)
+    except ValueError:  # Windows 上位於不同磁碟機
+        root = None
+    names = {}
+    for video in videos:
+        path = os.path.abspath(video)
+        if root is None:
+            relative = os.path.splitdrive(path)[1].lstrip("\\/")
+        else:
+            relative = os.path.relpath(path, root)
+        names[video] = os.path.splitext(relative)[0]
+
+    counts = Counter(os.path.normcase(name) for name in names.values())
+    for video, name in names.items():
+        if counts[os.path.normcase(name)] > 1:
+            names[video] = f"{name}_{os.path.splitext(video)[1].lstrip('.').lower()}"
+    return names
+
+
+def init_worker(cv_threads):
+    # 每個行程解一支影片，限制 OpenCV 內部執行緒數，避免行程數 × 執行緒數超過核心數
+    cv2.setNumThreads(cv_threads)
+
+
+def write_summary(summaries, path):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+def extract_batch(videos, output_folder="output", jobs=None, **options):
+    """以行程池平行處理多支影片，並將每支影片的摘要寫入 output_folder/extract_summary.csv。"""
+    if not videos:
+        print("⚠️ 找不到影片。")
+        return []
+    cpu_count = os.cpu_count() or 1
+    jobs = min(jobs or cpu_count, len(videos))
+    cv_threads = max(1, cpu_count // jobs)
+    options.setdefault("workers", cv_threads)
+    os.makedirs(output_folder, exist_ok=True)
+
+    print(f"🎞️ 共 {len(videos)} 支影片，{jobs} 個行程平行處理")
+    started = time.perf_counter()
+    summaries = []
+    names = output_names(videos)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(cv_threads,)) as executor:
+        futures = {executor.submit(extract_frames, video, output_folder, verbose=False,
+                                   save_name=names[video], **options): video
+                   for video in videos}
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                video = futures[future]
+                summary = {"video": video, "output": os.path.join(output_folder, names[video]),
+                           "status": f"錯誤：{e}", "saved": 0, "frames": 0, "seconds": 0.0, "fps": 0.0}
+            summaries.append(summary)
+            icon = {"ok": "✅", SKIPPED_STATUS: "⏭️"}.get(summary["status"], "❌")
+            print(f"{icon} {summary['video']} → {summary['output']}：儲存 {summary['saved']} 張，"
+                  f"{summary['frames']} 影格 / {summary['seconds']} 秒（{summary['fps']} fps）")
+
+    summaries.sort(key=lambda summary: summary["video"])
+    summary_path = os.path.join(output_folder, "extract_summary.csv")
+    write_summary(summaries, summary_path)
+    print(f"🎉 全部完成，耗時 {time.perf_counter() - started:.1f} 秒，摘要：{summary_path}")
+    return summaries
+
+
+def batch_main(argv=None):
+    parser = argparse.ArgumentParser(description="批次擷取影片影格（不開啟視窗）")
+    parser.add_argument("sources", nargs="+", help="影片、資料夾或萬用字元路徑（如 \"footage/**/*.mp4\"）")
+    parser.add_argument("-o", "--output", default="output", help="輸出資料夾（預設 output）")
+    parser.add_argument("-s", "--strategy", default="count", choices=STRATEGIES,
+                        help="取樣方式：count 固定張數、interval 每 N 秒、scene 場景變化")
+    parser.add_argument("-n", "--frames", type=int, default=0, help="每支影片擷取的影格數，0 代表全部（count）")
+    parser.add_argument("--interval", type=positive_float, default=1.0, help="取樣間隔秒數（interval）")
+    parser.add_argument("--scene-threshold", type=float, default=30.0,
+                        help="灰階縮圖平均差異門檻 0-255，越小取越多張（scene）")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="平行處理的影片數（預設為 CPU 核心數）")
+    parser.add_argument("--fast", action="store_true", help="以關鍵影格快速跳轉，不逐格精確定位")
+    parser.add_argument("--format", default="png", choices=["png", "jpg", "webp"], help="輸出格式")
+    parser.add_argument("--quality", type=int, default=None, help="JPG / WebP 品質 (0-100)")
+    parser.add_argument("--png-compression", type=int, default=3, help="PNG 壓縮等級 (0-9)")
+    parser.add_argument("--crop", type=parse_crop, default=None, help="裁切範圍 x,y,w,h（原始影格像素）")
+    parser.add_argument("--max-size", type=int, default=None, help="縮放至最長邊像素數（只縮小）")
+    parser.add_argument("--contact-sheet", action="store_true", help="另存縮圖總覽 contact_sheet.jpg")
+    args = parser.parse_args(argv)
+
+    extract_batch(
+        find_videos(args.sources), args.output, jobs=args.jobs,
+        frames_to_extract=args.frames if args.frames > 0 else None,
+        accurate=not args.fast,
+        image_format=args.format,
+        quality=args.quality,
+        png_compression=args.png_compression,
+        strategy=args.strategy,
+        interval=args.interval,
+        scene_threshold=args.scene_threshold,
+        crop=args.crop,
+        max_size=args.max_size,
+        contact_sheet=args.contact_sheet,
+    )
+
+
+def interactive_main():
     # 關閉 tkinter 主視窗
     root = Tk()
     root.withdraw()
@@ -59,7 +517,7 @@ if __name__ == "__main__":
     )
     if not video_path:
         print("⚠️ 未選擇影片，程式結束。")
-        exit()
+        return
 
     # ✅ 選擇輸出資料夾
     output_folder = filedialog.askdirectory(
@@ -67,16 +525,66 @@ if __name__ == "__main__":
     )
     if not output_folder:
         print("⚠️ 未選擇輸出資料夾，程式結束。")
-        exit()
+        return
+
+    # ✅ 選擇取樣方式
+    choice = input("請選擇取樣方式 1 固定張數 / 2 每 N 秒 / 3 場景變化 (預設 1)：").strip()
+    strategy = {"2": "interval", "3": "scene"}.get(choice, "count")
+    frames_to_extract = None
+    accurate = True
+    interval = 1.0
+    scene_threshold = 30.0
+
+    if strategy == "count":
+        # ✅ 輸入擷取影格數
+        try:
+            frames_to_extract_input = int(input("請輸入要擷取的影格數 (輸入 0 代表全部)："))
+            frames_to_extract = frames_to_extract_input if frames_to_extract_input > 0 else None
+        except:
+            print("⚠️ 輸入格式錯誤，預設擷取全部影格。")
+            frames_to_extract = None
 
-    # ✅ 輸入擷取影格數
+        # ✅ 稀疏擷取時可改用快速跳轉（長影片明顯較快，但部分格式影格位置可能略有偏差）
+        if frames_to_extract is not None:
+            accurate = input("是否逐格精確定位？(Y/n，輸入 n 改用快速跳轉)：").strip().lower() != "n"
+    elif strategy == "interval":
+        try:
+            interval = float(input("請輸入取樣間隔秒數："))
+            if not interval > 0:
+                raise ValueError
+        except:
+            print("⚠️ 輸入格式錯誤，預設每 1 秒取一張。")
+            interval = 1.0
+    else:
+        try:
+            scene_threshold = float(input("請輸入場景變化門檻 (0-255，預設 30，越小取越多張)：") or 30)
+        except:
+            print("⚠️ 輸入格式錯誤，預設門檻 30。")
+            scene_threshold = 30.0
+
+    # ✅ 輸出格式（PNG 無損；JPG / WebP 檔案小、寫入快）
+    image_format = input("請輸入輸出格式 png / jpg / webp (預設 png)：").strip().lower() or "png"
+    if image_format not in ("png", "jpg", "jpeg", "webp"):
+        print("⚠️ 輸入格式錯誤，預設輸出 PNG。")
+        image_format = "png"
+
+    # ✅ 縮放（4K 影片縮小後編碼、寫檔與容量都大幅減少）
     try:
-        frames_to_extract_input = int(input("請輸入要擷取的影格數 (輸入 0 代表全部)："))
-        frames_to_extract = frames_to_extract_input if frames_to_extract_input > 0 else None
+        max_size = int(input("請輸入輸出影像最長邊像素 (輸入 0 代表原尺寸)：") or 0) or None
     except:
-        print("⚠️ 輸入格式錯誤，預設擷取全部影格。")
-        frames_to_extract = None
+        print("⚠️ 輸入格式錯誤，預設輸出原尺寸。")
+        max_size = None
+    contact_sheet = input("是否另存縮圖總覽？(y/N)：").strip().lower() == "y"
 
     # ✅ 執行擷取
-    extract_frames(video_path, output_folder, frames_to_extract)
+    extract_frames(video_path, output_folder, frames_to_extract, accurate, image_format,
+                   strategy=strategy, interval=interval, scene_threshold=scene_threshold,
+                   max_size=max_size, contact_sheet=contact_sheet)
 
+
+if __name__ == "__main__":
+    # 有參數時為批次模式，否則以對話框選擇單一影片
+    if len(sys.argv) > 1:
+        batch_main()
+    else:
+        interactive_main()
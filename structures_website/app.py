@@ -1,99 +1,638 @@
 #!/usr/bin/env python
 import os
 import logging
-from flask import Flask, request, render_template, redirect, url_for, flash, jsonify
-from sqlalchemy import create_engine, text
-import pandas as pd
+import json
+import math
+import threading
+import uuid
+import itertools
+from functools import lru_cache
+from pathlib import Path
+from flask import (Flask, Blueprint, current_app, request, render_template, redirect, url_for, flash,
+                   Response, stream_with_context)
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from openpyxl import load_workbook
 from datetime import datetime
-from sqlalchemy import text
 
-app = Flask(__name__)
-app.secret_key = 'cyhung^209_123' 
+bp = Blueprint('structures', __name__)
+
+DATABASE_PATH = os.environ.get("STRUCTURES_DB", "structures.db")
+
+# 每個連線池中的連線建立時套用的 SQLite 設定
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,  # 遇到寫入鎖時最多等 5 秒，而不是直接回傳 database is locked
+    "mmap_size": 256 * 1024 * 1024,  # 以記憶體映射讀取資料庫檔
+    "cache_size": -64 * 1024,  # 每個連線 64 MB page cache（負值單位為 KiB）
+}
+# 讀寫連線另外啟用 WAL：上傳寫入時，查詢仍可讀取上一版資料而不被鎖住
+SQLITE_WRITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+}
+
+engine = None  # 讀寫連線，供上傳使用
+read_engine = None  # 唯讀連線，供查詢使用
+metadata_cache = None
+
+
+def create_sqlite_engine(database_path, read_only=False):
+    """建立 SQLite engine，連線池中的每個連線都會套用 SQLITE_PRAGMAS"""
+    if read_only:
+        url = f"sqlite:///{Path(database_path).resolve().as_uri()}?mode=ro&uri=true"
+        pragmas = SQLITE_PRAGMAS
+    else:
+        url = f"sqlite:///{database_path}"
+        pragmas = {**SQLITE_PRAGMAS, **SQLITE_WRITE_PRAGMAS}
+    db_engine = create_engine(url)
+
+    @event.listens_for(db_engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        # pysqlite 預設不會在 DDL 前開始交易，改由 SQLAlchemy 明確送出 BEGIN，
+        # 上傳時的 DROP / CREATE / ALTER TABLE 才會和資料寫入在同一個交易中
+        dbapi_connection.isolation_level = None
+        for name, value in pragmas.items():
+            dbapi_connection.execute(f"PRAGMA {name} = {value}")
+
+    @event.listens_for(db_engine, "begin")
+    def begin_transaction(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return db_engine
+
+
+def init_database(database_path):
+    """建立讀寫與唯讀 engine，並確保 meta 資料表存在"""
+    global engine, read_engine, metadata_cache
+    engine = create_sqlite_engine(database_path)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """))
+    read_engine = create_sqlite_engine(database_path, read_only=True)
+    metadata_cache = MetadataCache(os.path.abspath(database_path))
+
+
+def create_app(database_path=None):
+    """建立 Flask app，供 gunicorn、waitress 等 WSGI 伺服器使用"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SECRET_KEY", 'cyhung^209_123')
+    init_database(database_path or DATABASE_PATH)
+    app.register_blueprint(bp)
+    return app
 
-DATABASE_URL = "sqlite:///structures.db"
-engine = create_engine(DATABASE_URL)
 
 ALLOWED_SEARCH_FIELDS = ["FID", "構造物編碼", "權屬分署", "調查年分", "所屬工程", "所屬工程編號", "X_TWD97",
                          "Y_TWD97", "縣市", "功能評估", "子集水區"]
 
-
-with engine.begin() as conn:
-    conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS meta (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
+# 上傳時建立的索引：體檢表以 FID 為主鍵，其餘可搜尋欄位各建一個索引
+STRUCTURE_INDEXES = [(col,) for col in ALLOWED_SEARCH_FIELDS if col != "FID"]
+# 巡查表依 FID 查詢並依巡查年分排序
+INSPECTION_INDEXES = [("FID", "巡查年分"), ("巡查年分",)]
+
+# 合併上傳時比對資料列的 key
+STRUCTURE_KEY = ["FID"]
+INSPECTION_KEY = ["FID", "巡查年分"]
+
+# Excel 上傳時每批寫入的列數，第一批資料也用來推斷欄位型別
+INGEST_CHUNK_SIZE = 5000
+
+# 模糊搜尋用的 FTS5 全文索引（trigram 斷詞，中文子字串也能比對）
+FTS_TABLE = "structures_fts"
+# trigram 索引只能處理至少 3 個字的關鍵字，較短的關鍵字改用 LIKE
+FTS_MIN_KEYWORD_LENGTH = 3
+
+# 依 TWD97 座標搜尋用的 R*Tree 空間索引
+RTREE_TABLE = "structures_rtree"
+
+# 搜尋結果分頁（以 FID 為 keyset）
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+PAGE_SIZE_OPTIONS = [50, 100, 500, 1000]
+
+# /fetch_inspection_data 回應快取的筆數（以資料版本 + FID 為 key）
+INSPECTION_CACHE_SIZE = 512
+
+
+class MetadataCache:
+    """快取資料表欄位與最後更新時間
+
+    只有上傳資料時才會變動，上傳後會呼叫 invalidate()；
+    多個 worker 時則比對資料庫檔案（含 WAL 檔）的修改時間與大小，
+    其他 process 寫入資料庫後快取也會失效。
+    """
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._values = {}
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.database_path, self.database_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def get(self, key, loader):
+        signature = self._file_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._values.clear()
+                self._signature = signature
+            if key in self._values:
+                return self._values[key]
+
+        value = loader()
+        with self._lock:
+            if signature == self._signature:
+                self._values[key] = value
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._values.clear()
+            self._signature = None
+
+
+def get_table_columns(table):
+    """回傳資料表欄位名稱（快取），資料表不存在時回傳空 list"""
+    def load():
+        with read_engine.connect() as conn:
+            result = conn.execute(text("SELECT name FROM pragma_table_info(:table)"), {'table': table})
+            return [row[0] for row in result]
+    return metadata_cache.get(('columns', table), load)
+
+
+def get_last_update_time():
+    """回傳資料庫最後更新時間（快取）"""
+    def load():
+        with read_engine.connect() as conn:
+            result = conn.execute(text("SELECT value FROM meta WHERE key='last_update'")).fetchone()
+            return result[0] if result else "尚未更新"
+    return metadata_cache.get('last_update', load)
+
+
+def get_data_version():
+    """回傳資料版本（快取），每次上傳都會換成新的值"""
+    def load():
+        with read_engine.connect() as conn:
+            result = conn.execute(text("SELECT value FROM meta WHERE key='data_version'")).fetchone()
+            return result[0] if result else "0"
+    return metadata_cache.get('data_version', load)
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def read_excel_rows(file):
+    """以唯讀模式逐列讀取 Excel 第一個工作表，回傳 (欄位名稱, 資料列 iterator)
+
+    欄位名稱的處理方式與 pandas.read_excel 相同：空白標題為 "Unnamed: n"，
+    重複標題依序加上 ".1"、".2"。
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    header = next(rows, None)
+    if not header:
+        workbook.close()
+        raise ValueError("Excel 檔沒有標題列")
+
+    columns = []
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else str(name)
+        base, n = name, 0
+        while name in columns:
+            n += 1
+            name = f"{base}.{n}"
+        columns.append(name)
+
+    def iter_rows():
+        try:
+            for row in rows:
+                if row is None or all(value is None for value in row):
+                    continue
+                row = [sqlite_value(value) for value in row[:len(columns)]]
+                yield tuple(row + [None] * (len(columns) - len(row)))
+        finally:
+            workbook.close()
+
+    return columns, iter_rows()
+
+
+def sqlite_value(value):
+    """將儲存格的值轉成 SQLite 可寫入的型別"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)  # 日期、時間等其他型別存成文字
+
+
+def sqlite_type(values):
+    """依一批資料推斷 SQLite 欄位型別"""
+    values = [value for value in values if value is not None]
+    if not values:
+        return "TEXT"
+    if all(isinstance(value, (bool, int)) for value in values):
+        return "INTEGER"
+    if all(isinstance(value, (bool, int, float)) for value in values):
+        return "REAL"
+    return "TEXT"
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_staging_table(conn, file, staging, primary_key=None):
+    """將 Excel 逐批寫入暫存資料表，欄位型別依第一批資料推斷，回傳 (欄位名稱, 筆數)"""
+    columns, rows = read_excel_rows(file)
+    chunks = chunked(rows, INGEST_CHUNK_SIZE)
+    first_chunk = next(chunks, [])
+
+    column_defs = []
+    for i, col in enumerate(columns):
+        column_type = sqlite_type(row[i] for row in first_chunk)
+        if col == primary_key:
+            # 不可宣告成 INTEGER PRIMARY KEY：那會成為 rowid 的別名，空白的值會被自動編號，
+            # 第一批之後出現的非整數值也會寫入失敗；INT 的型別親和性相同，但不是別名
+            if column_type == "INTEGER":
+                column_type = "INT"
+            column_type += " NOT NULL PRIMARY KEY"
+        column_defs.append(f"{quote_identifier(col)} {column_type}")
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {quote_identifier(staging)}"))
+    conn.execute(text(f"CREATE TABLE {quote_identifier(staging)} ({', '.join(column_defs)})"))
+
+    insert_sql = (f"INSERT INTO {quote_identifier(staging)} "
+                  f"VALUES ({', '.join('?' for _ in columns)})")
+    row_count = 0
+    try:
+        for chunk in itertools.chain([first_chunk], chunks):
+            if chunk:
+                conn.exec_driver_sql(insert_sql, chunk)
+                row_count += len(chunk)
+    except IntegrityError as e:
+        message = str(e.orig)
+        if message.startswith("NOT NULL constraint failed"):
+            raise ValueError(f"{primary_key} 不可空白")
+        if message.startswith("UNIQUE constraint failed"):
+            raise ValueError(f"{primary_key} 有重複值")
+        raise
+    return columns, row_count
+
+
+def create_indexes(conn, table, columns, indexes):
+    for index_columns in indexes:
+        if not all(col in columns for col in index_columns):
+            continue
+        index_name = f"idx_{table}_{'_'.join(index_columns)}"
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} ON {quote_identifier(table)} "
+                          f"({', '.join(quote_identifier(col) for col in index_columns)})"))
+
+
+def replace_table(conn, file, table, primary_key=None, indexes=()):
+    """將 Excel 寫入暫存資料表，再改名取代正式資料表並建立索引，回傳欄位名稱
+
+    須在交易中呼叫：提交前其他連線只會看到舊的完整資料表，不會看到寫到一半的資料。
+    """
+    staging = f"{table}__staging"
+    columns, row_count = load_staging_table(conn, file, staging, primary_key)
+    conn.execute(text(f"DROP TABLE IF EXISTS {quote_identifier(table)}"))
+    conn.execute(text(f"ALTER TABLE {quote_identifier(staging)} RENAME TO {quote_identifier(table)}"))
+
+    # 資料寫入後再建索引，比逐筆維護索引快
+    create_indexes(conn, table, columns, indexes)
+    conn.execute(text(f"ANALYZE {quote_identifier(table)}"))
+    return columns, row_count
+
+
+def table_column_types(conn, table):
+    """回傳 {欄位名稱: 宣告型別}，資料表不存在時回傳空 dict"""
+    result = conn.execute(text("SELECT name, type FROM pragma_table_info(:table)"), {'table': table})
+    return {name: column_type for name, column_type in result}
+
+
+def merge_table(conn, file, table, key_columns, primary_key=None, indexes=(),
+                before_delete=None, after_insert=None):
+    """將 Excel 依 key_columns 合併進資料表，回傳 {'inserted', 'updated', 'unchanged'} 筆數
+
+    上傳檔中每個 key 的資料列會取代資料表中同 key 的資料列；內容完全相同的 key 不會寫入，
+    索引維護量只與有變動的資料成正比。before_delete / after_insert 會以
+    (conn, 受影響資料列的 WHERE 條件) 呼叫，用來同步衍生的索引表；資料表不存在時
+    直接以整表取代建立，不會呼叫。須在交易中呼叫。
+    """
+    live_types = table_column_types(conn, table)
+    if not live_types:
+        columns, row_count = replace_table(conn, file, table, primary_key, indexes)
+        return {'inserted': row_count, 'updated': 0, 'unchanged': 0}
+
+    staging = f"{table}__staging"
+    columns, _ = load_staging_table(conn, file, staging, primary_key)
+    missing_keys = [col for col in key_columns if col not in columns]
+    if missing_keys:
+        raise ValueError(f"缺少合併用的欄位：{'、'.join(missing_keys)}")
+
+    # 上傳檔有新欄位時加到資料表
+    for col, column_type in table_column_types(conn, staging).items():
+        if col not in live_types:
+            conn.execute(text(f"ALTER TABLE {quote_identifier(table)} "
+                              f"ADD COLUMN {quote_identifier(col)} {column_type}"))
+    create_indexes(conn, staging, columns, [key_columns])
+
+    q_table, q_staging = quote_identifier(table), quote_identifier(staging)
+    keys = ", ".join(quote_identifier(col) for col in key_columns)
+
+    def match(left, right, cols, operator):
+        return " AND ".join(f"{left}.{quote_identifier(col)} {operator} {right}.{quote_identifier(col)}"
+                            for col in cols)
+
+    # 逐一比對上傳檔中的 key：資料表沒有 → inserted；兩邊的資料列完全相同 → unchanged；其餘 → updated
+    # key 一律以 IS 比對，key 欄位為 NULL（如空白的巡查年分）的資料列也能對上，且仍可使用索引
+    conn.execute(text("DROP TABLE IF EXISTS temp.merge_keys"))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE merge_keys AS
+        SELECT {keys}, CASE
+            WHEN NOT EXISTS (SELECT 1 FROM {q_table} l WHERE {match('l', 'k', key_columns, 'IS')})
+                THEN 'inserted'
+            WHEN EXISTS (SELECT 1 FROM {q_staging} s WHERE {match('s', 'k', key_columns, 'IS')}
+                         AND NOT EXISTS (SELECT 1 FROM {q_table} l WHERE {match('l', 's', columns, 'IS')}))
+              OR EXISTS (SELECT 1 FROM {q_table} l WHERE {match('l', 'k', key_columns, 'IS')}
+                         AND NOT EXISTS (SELECT 1 FROM {q_staging} s WHERE {match('s', 'l', columns, 'IS')}))
+                THEN 'updated'
+            ELSE 'unchanged'
+        END AS action
+        FROM (SELECT DISTINCT {keys} FROM {q_staging}) k
+    """))
+    # 沒有索引時，下面每筆 staging 資料列都要掃描整個 merge_keys，成本與上傳筆數平方成正比
+    conn.execute(text(f"CREATE INDEX temp.merge_keys_key ON merge_keys ({keys}, action)"))
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    result = conn.execute(text(f"""
+        SELECT m.action, count(*) FROM {q_staging} s
+        JOIN merge_keys m ON {match('m', 's', key_columns, 'IS')}
+        GROUP BY m.action
     """))
+    counts.update({action: count for action, count in result})
+
+    # 由有變動的 key 查出資料表的 rowid，成本只與變動筆數成正比
+    changed = (f"rowid IN (SELECT l.rowid FROM temp.merge_keys m JOIN {q_table} l "
+               f"ON {match('l', 'm', key_columns, 'IS')} WHERE m.action != 'unchanged')")
+    if before_delete:
+        before_delete(conn, changed)
+    conn.execute(text(f"DELETE FROM {q_table} WHERE {changed}"))
+    column_list = ", ".join(quote_identifier(col) for col in columns)
+    conn.execute(text(f"""
+        INSERT INTO {q_table} ({column_list})
+        SELECT {", ".join(f"s.{quote_identifier(col)}" for col in columns)}
+        FROM temp.merge_keys m JOIN {q_staging} s ON {match('s', 'm', key_columns, 'IS')}
+        WHERE m.action != 'unchanged'
+    """))
+    if after_insert:
+        after_insert(conn, changed)
+
+    conn.execute(text(f"DROP TABLE {q_staging}"))
+    conn.execute(text("DROP TABLE temp.merge_keys"))
+    create_indexes(conn, table, columns, indexes)
+    return counts
+
+
+def rebuild_search_index(conn, columns):
+    """重建體檢表的 FTS5 全文索引，SQLite 不支援 FTS5 時回傳 False"""
+    conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    fts_columns = [col for col in ALLOWED_SEARCH_FIELDS if col != "FID" and col in columns]
+    if not fts_columns:
+        return False
 
-@app.route('/', methods=['GET', 'POST'])
+    try:
+        conn.execute(text(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                          f"{', '.join(quote_identifier(col) for col in fts_columns)}, "
+                          f"content='structures', tokenize='trigram')"))
+    except OperationalError as e:
+        logging.warning(f"FTS5 unavailable, keyword search falls back to LIKE: {e}")
+        return False
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def delete_search_index_rows(conn, condition):
+    """自全文索引移除即將被刪除的體檢表資料列（須在刪除前呼叫）"""
+    fts_columns = table_column_types(conn, FTS_TABLE)
+    if fts_columns:
+        column_list = ", ".join(quote_identifier(col) for col in fts_columns)
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {column_list}) "
+                          f"SELECT 'delete', rowid, {column_list} FROM structures WHERE {condition}"))
+
+
+def insert_search_index_rows(conn, condition):
+    """將新寫入的體檢表資料列加入全文索引"""
+    fts_columns = table_column_types(conn, FTS_TABLE)
+    if fts_columns:
+        column_list = ", ".join(quote_identifier(col) for col in fts_columns)
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, {column_list}) "
+                          f"SELECT rowid, {column_list} FROM structures WHERE {condition}"))
+
+
+def rebuild_spatial_index(conn):
+    """重建體檢表 X_TWD97 / Y_TWD97 的 R*Tree 空間索引，SQLite 不支援 R*Tree 時回傳 False"""
+    conn.execute(text(f"DROP TABLE IF EXISTS {RTREE_TABLE}"))
+    columns = table_column_types(conn, 'structures')
+    if "X_TWD97" not in columns or "Y_TWD97" not in columns:
+        return False
+
+    try:
+        conn.execute(text(f"CREATE VIRTUAL TABLE {RTREE_TABLE} USING rtree(id, min_x, max_x, min_y, max_y)"))
+    except OperationalError as e:
+        logging.warning(f"R*Tree unavailable, spatial search falls back to a table scan: {e}")
+        return False
+    insert_spatial_index_rows(conn, "1")
+    return True
+
+
+def delete_spatial_index_rows(conn, condition):
+    """自空間索引移除即將被刪除的體檢表資料列（須在刪除前呼叫）"""
+    if table_column_types(conn, RTREE_TABLE):
+        conn.execute(text(f"DELETE FROM {RTREE_TABLE} "
+                          f"WHERE id IN (SELECT rowid FROM structures WHERE {condition})"))
+
+
+def insert_spatial_index_rows(conn, condition):
+    """將有座標的體檢表資料列加入空間索引（每筆為一個點）"""
+    if table_column_types(conn, RTREE_TABLE):
+        conn.execute(text(f"""
+            INSERT INTO {RTREE_TABLE} (id, min_x, max_x, min_y, max_y)
+            SELECT rowid, "X_TWD97", "X_TWD97", "Y_TWD97", "Y_TWD97" FROM structures
+            WHERE ({condition})
+              AND typeof("X_TWD97") IN ('integer', 'real') AND typeof("Y_TWD97") IN ('integer', 'real')
+        """))
+
+
+def delete_structure_index_rows(conn, condition):
+    delete_search_index_rows(conn, condition)
+    delete_spatial_index_rows(conn, condition)
+
+
+def insert_structure_index_rows(conn, condition):
+    insert_search_index_rows(conn, condition)
+    insert_spatial_index_rows(conn, condition)
+
+
+def structure_filter(field, keyword):
+    """組出篩選體檢表的 WHERE 條件與參數"""
+    if field == "FID":  # 精確搜尋
+        return "FID = :keyword", {'keyword': keyword}
+
+    # 模糊搜尋：關鍵字夠長且欄位有全文索引時走 FTS5，否則退回 LIKE
+    if len(keyword) >= FTS_MIN_KEYWORD_LENGTH and field in get_table_columns(FTS_TABLE):
+        condition = (f"rowid IN (SELECT rowid FROM {FTS_TABLE} "
+                     f"WHERE {quote_identifier(field)} LIKE :keyword)")
+    else:
+        condition = f"{quote_identifier(field)} LIKE :keyword"
+    return condition, {'keyword': f"%{keyword}%"}
+
+
+def bbox_filter(min_x, min_y, max_x, max_y):
+    """組出篩選座標範圍內體檢表的 WHERE 條件與參數"""
+    condition = '"X_TWD97" BETWEEN :min_x AND :max_x AND "Y_TWD97" BETWEEN :min_y AND :max_y'
+    # 有空間索引時以 R*Tree 找出候選資料列，原始座標只用來精確比對（R*Tree 以單精度儲存）；
+    # 座標欄位前的 + 讓查詢規劃不改走 X_TWD97 / Y_TWD97 的 B-tree 索引
+    if get_table_columns(RTREE_TABLE):
+        condition = (f"rowid IN (SELECT id FROM {RTREE_TABLE} "
+                     f"WHERE max_x >= :min_x AND min_x <= :max_x AND max_y >= :min_y AND min_y <= :max_y) "
+                     f'AND +"X_TWD97" BETWEEN :min_x AND :max_x AND +"Y_TWD97" BETWEEN :min_y AND :max_y')
+    return condition, {'min_x': min_x, 'min_y': min_y, 'max_x': max_x, 'max_y': max_y}
+
+
+def radius_filter(x, y, radius):
+    """組出篩選距離 (x, y) radius 公尺內體檢表的 WHERE 條件與參數"""
+    condition, params = bbox_filter(x - radius, y - radius, x + radius, y + radius)
+    condition += ' AND ("X_TWD97" - :x) * ("X_TWD97" - :x) + ("Y_TWD97" - :y) * ("Y_TWD97" - :y) <= :radius_sq'
+    params.update({'x': x, 'y': y, 'radius_sq': radius * radius})
+    return condition, params
+
+
+def resolve_matched_fids(conn, condition, params):
+    """將符合搜尋條件的 FID 寫入連線的暫存表 matched_fids"""
+    conn.execute(text("DROP TABLE IF EXISTS temp.matched_fids"))
+    conn.execute(text("CREATE TEMP TABLE matched_fids (FID PRIMARY KEY)"))
+    conn.execute(text(f"INSERT OR IGNORE INTO matched_fids SELECT FID FROM structures WHERE {condition}"), params)
+
+
+def select_matched_structures(conn, after=None, limit=None):
+    """依 FID 順序取出 matched_fids 對應的體檢表，after 為上一頁最後一筆 FID"""
+    query = "SELECT s.* FROM matched_fids m JOIN structures s ON s.FID = m.FID"
+    params = {}
+    if after is not None:
+        query += " WHERE s.FID > :after"
+        params['after'] = after
+    query += " ORDER BY m.FID"
+    if limit is not None:
+        query += " LIMIT :limit"
+        params['limit'] = limit
+    return conn.execute(text(query), params)
+
+
+def page_size_arg(values):
+    """讀取並限制每頁筆數"""
+    page_size = values.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+    return min(max(page_size, 1), MAX_PAGE_SIZE)
+
+
+def inspection_years_of(inspection_data):
+    """由已排序的巡查資料取出不重複的巡查年份（巡查年分前 4 碼）"""
+    years = []
+    for row in inspection_data:
+        year = row['巡查年分']
+        if year is not None and str(year)[:4] not in years:
+            years.append(str(year)[:4])
+    return years
+
+
+def spatial_args(values):
+    """讀取座標搜尋參數 (x, y, radius)，格式錯誤時回傳 None"""
+    x = values.get('x', type=float)
+    y = values.get('y', type=float)
+    radius = values.get('radius', type=float)
+    if x is None or y is None or radius is None or radius < 0:
+        return None
+    return x, y, radius
+
+
+@bp.route('/', methods=['GET', 'POST'])
 def index():
     field = None
     keyword = None
+    search_mode = 'field'  # field：欄位關鍵字搜尋；spatial：座標半徑搜尋
+    spatial = {}  # 座標搜尋的 x、y、radius
+    search_params = {}  # 換頁時需要帶回的搜尋條件
     structure_data = []  # 體檢表資料
     inspection_data = []  # 巡查表資料
     inspection_years = []  # 有巡查的年份
-    structure_fields = []  # 體檢表的欄位名稱
-    last_update_time = "尚未更新"
-    with engine.connect() as conn:
-        result = conn.execute(text("SELECT value FROM meta WHERE key='last_update'")).fetchone()
-        if result:
-            last_update_time = result[0]
-
-    # 獲取體檢表的欄位名稱
-    with engine.connect() as conn:
-        field_query = "PRAGMA table_info(structures)"
-        fields_result = conn.execute(text(field_query))
-        structure_fields = [row._mapping['name'] for row in fields_result]
+    match_count = 0  # 符合搜尋條件的體檢表筆數
+    after = None  # 本頁起點（上一頁最後一筆 FID）
+    next_after = None  # 下一頁起點，沒有下一頁時為 None
+    page_size = page_size_arg(request.form)
+    last_update_time = get_last_update_time()
 
     if request.method == 'POST':
-        field = request.form.get('field')  # 使用者選擇的欄位
-        keyword = request.form.get('keyword')  # 使用者輸入的關鍵字
-
-        if field and keyword:
-            # 檢查選擇的欄位是否有效
-            if field not in ALLOWED_SEARCH_FIELDS:
-                return "The selected field is not searchable", 400
-
-            # 決定搜尋方式
-            if field == "FID":  # 精確搜尋
-                operator = "="
-            else:  # 模糊搜尋
-                operator = "LIKE"
-
-            # 查詢體檢表 (structures)
-            structure_query = f"SELECT * FROM structures WHERE {field} {operator} :keyword"
-            # 查詢巡查表 (inspection_table)
-            inspection_query = f"""
-                SELECT * FROM inspection_table 
-                WHERE FID IN (SELECT FID FROM structures WHERE {field} {operator} :keyword)
-            """
-            # 查詢有巡查的年份
-            year_query = f"""
-                SELECT DISTINCT substr("巡查年分", 1, 4) AS Year 
-                FROM inspection_table 
-                WHERE FID IN (SELECT FID FROM structures WHERE {field} {operator} :keyword)
-            """
-
-            # 為精確或模糊搜尋準備參數
-            query_param = keyword if operator == "=" else f"%{keyword}%"
-
-            # 執行查詢
-            with engine.connect() as conn:
-                structure_result = conn.execute(text(structure_query), {'keyword': query_param})
-                inspection_result = conn.execute(text(inspection_query), {'keyword': query_param})
-                year_result = conn.execute(text(year_query), {'keyword': query_param})
-
-                # 使用 row._mapping 來安全地處理查詢結果
-                structure_data = [row._mapping for row in structure_result]
-                inspection_data = [row._mapping for row in inspection_result]
-                inspection_data = sorted(inspection_data, key=lambda x: x['巡查年分'])
-
-                
-                # 如果有多條體檢表資料，清空巡查年份，否則正常處理
-                if len(structure_data) > 1:
-                    inspection_years = []
-                else:
-                    inspection_years = [row._mapping['Year'] for row in year_result]
+        search_mode = request.form.get('search_mode', 'field')
+        after = request.form.get('after', type=int)
+        condition = None
+
+        if search_mode == 'spatial':
+            args = spatial_args(request.form)
+            if args is None:
+                return "Invalid coordinates or radius", 400
+            x, y, radius = args
+            spatial = {'x': x, 'y': y, 'radius': radius}
+            search_params = {'search_mode': search_mode, **spatial}
+            condition, params = radius_filter(x, y, radius)
+        else:
+            field = request.form.get('field')  # 使用者選擇的欄位
+            keyword = request.form.get('keyword')  # 使用者輸入的關鍵字
+
+            if field and keyword:
+                # 檢查選擇的欄位是否有效
+                if field not in ALLOWED_SEARCH_FIELDS:
+                    return "The selected field is not searchable", 400
+                search_params = {'field': field, 'keyword': keyword}
+                condition, params = structure_filter(field, keyword)
+
+        if condition:
+            # 執行查詢：先找出符合條件的 FID，再由暫存表取出體檢表、巡查表與巡查年份
+            with read_engine.connect() as conn:
+                resolve_matched_fids(conn, condition, params)
+                match_count = conn.execute(text("SELECT count(*) FROM matched_fids")).scalar()
+
+                # 只取一頁（多取一筆判斷是否還有下一頁）
+                structure_data = select_matched_structures(conn, after, page_size + 1).mappings().all()
+                if len(structure_data) > page_size:
+                    structure_data = structure_data[:page_size]
+                    next_after = structure_data[-1]['FID']
+
+                # 只有單筆體檢表時才顯示巡查表與巡查年份
+                if match_count == 1:
+                    inspection_query = """
+                        SELECT * FROM inspection_table
+                        WHERE FID IN (SELECT FID FROM matched_fids)
+                        ORDER BY "巡查年分"
+                    """
+                    inspection_data = conn.execute(text(inspection_query)).mappings().all()
+                    inspection_years = inspection_years_of(inspection_data)
 
     return render_template('index.html', 
                        structure_data=structure_data, 
@@ -102,81 +641,193 @@ def index():
                        structure_fields=ALLOWED_SEARCH_FIELDS, 
                        selected_field=field, 
                        search_value=keyword,
+                       search_mode=search_mode,
+                       spatial=spatial,
+                       search_params=search_params,
+                       match_count=match_count,
+                       after=after,
+                       next_after=next_after,
+                       page_size=page_size,
+                       page_size_options=PAGE_SIZE_OPTIONS,
                        last_update_time=last_update_time)
 
-@app.route('/fetch_inspection_data', methods=['GET'])
+
+@bp.route('/search.ndjson', methods=['GET'])
+def search_ndjson():
+    """以 NDJSON 串流輸出搜尋結果，每行一筆體檢表"""
+    field = request.args.get('field')
+    keyword = request.args.get('keyword')
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', type=int)
+    if not field or not keyword:
+        return {"error": "field and keyword are required"}, 400
+    if field not in ALLOWED_SEARCH_FIELDS:
+        return {"error": "The selected field is not searchable"}, 400
+
+    def generate():
+        with read_engine.connect() as conn:
+            resolve_matched_fids(conn, *structure_filter(field, keyword))
+            # 逐批自資料庫讀取，記憶體用量與結果筆數無關
+            result = select_matched_structures(conn, after, limit).mappings().yield_per(500)
+            for row in result:
+                yield json.dumps(dict(row), ensure_ascii=False, default=str) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@bp.route('/api/structures/nearby', methods=['GET'])
+def structures_nearby():
+    """回傳距離 (x, y) radius 公尺內的體檢表，依距離由近到遠排序"""
+    args = spatial_args(request.args)
+    if args is None:
+        return {"error": "x, y and a non-negative radius are required"}, 400
+    x, y, radius = args
+    limit = page_size_arg(request.args)
+
+    condition, params = radius_filter(x, y, radius)
+    query = f"""
+        SELECT *, ("X_TWD97" - :x) * ("X_TWD97" - :x) + ("Y_TWD97" - :y) * ("Y_TWD97" - :y) AS distance_sq
+        FROM structures WHERE {condition}
+        ORDER BY distance_sq LIMIT :limit
+    """
+    with read_engine.connect() as conn:
+        result = conn.execute(text(query), {**params, 'limit': limit}).mappings().all()
+
+    structures = []
+    for row in result:
+        row = dict(row)
+        row['distance'] = round(math.sqrt(row.pop('distance_sq')), 2)
+        structures.append(row)
+    return {"structures": structures}
+
+
+@bp.route('/api/structures/bbox', methods=['GET'])
+def structures_in_bbox():
+    """回傳座標範圍內的體檢表，依 FID 分頁（after 為上一頁最後一筆 FID）"""
+    bounds = [request.args.get(name, type=float) for name in ('min_x', 'min_y', 'max_x', 'max_y')]
+    if None in bounds:
+        return {"error": "min_x, min_y, max_x and max_y are required"}, 400
+    after = request.args.get('after', type=int)
+    limit = page_size_arg(request.args)
+
+    condition, params = bbox_filter(*bounds)
+    query = f"SELECT * FROM structures WHERE {condition}"
+    if after is not None:
+        query += " AND FID > :after"
+        params['after'] = after
+    query += " ORDER BY FID LIMIT :limit"
+    with read_engine.connect() as conn:
+        structures = [dict(row) for row in conn.execute(text(query), {**params, 'limit': limit + 1}).mappings()]
+
+    next_after = None
+    if len(structures) > limit:
+        structures = structures[:limit]
+        next_after = structures[-1]['FID']
+    return {"structures": structures, "next_after": next_after}
+
+
+@lru_cache(maxsize=INSPECTION_CACHE_SIZE)
+def inspection_payload(data_version, fid):
+    """查詢單一 FID 的巡查資料並序列化為 JSON
+
+    data_version 只用來當快取 key，上傳後舊版本的回應不會再被取用，會自然被 LRU 淘汰。
+    """
+    inspection_query = "SELECT * FROM inspection_table WHERE FID = :fid ORDER BY \"巡查年分\""
+
+    columns = get_table_columns('inspection_table')
+
+    with read_engine.connect() as conn:
+        inspection_result = conn.execute(text(inspection_query), {'fid': fid}).mappings().all()
+
+    # Extract data and transform results
+    inspection_data = [dict(row) for row in inspection_result]
+    years = inspection_years_of(inspection_data)
+
+    return current_app.json.dumps({"inspectionData": inspection_data, "years": years, "fields": columns})
+
+
+@bp.route('/fetch_inspection_data', methods=['GET'])
 def fetch_inspection_data():
     fid = request.args.get('fid')  # Get the FID from request
     if not fid or not fid.isdigit():
         return {"error": "Invalid FID provided"}, 400
+    fid = str(int(fid))
 
     try:
-        inspection_query = "SELECT * FROM inspection_table WHERE FID = :fid"
-        year_query = "SELECT DISTINCT substr(\"巡查年分\", 1, 4) AS Year FROM inspection_table WHERE FID = :fid"
-
-        with engine.connect() as conn:
-
-            column_query = "PRAGMA table_info(inspection_table)"
-            columns_result = conn.execute(text(column_query)).mappings().all()
-            columns = [row['name'] for row in columns_result]  # Get the column
-
-
-            inspection_result = conn.execute(text(inspection_query), {'fid': fid}).mappings().all()
-            year_result = conn.execute(text(year_query), {'fid': fid}).mappings().all()
-
-            # Extract data and transform results
-            inspection_data = [dict(row) for row in inspection_result]
-            inspection_data = sorted(inspection_data, key=lambda x: x.get('巡查年分', ''))
-            years = [row['Year'] for row in year_result]
-
-        if not inspection_data:
-            return jsonify({"inspectionData": [], "years": [], "fields": columns})
-
-        return jsonify({"inspectionData": inspection_data, "years": years, "fields": columns})
+        # The ETag only changes after an upload, so repeat views get a 304
+        data_version = get_data_version()
+        response = Response(inspection_payload(data_version, fid), mimetype='application/json')
+        response.set_etag(f"{data_version}-{fid}")
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
 
     except Exception as e:
         logging.error(f"Error fetching data for FID {fid}: {e}")
         return {"error": "An unexpected error occurred", "details": str(e)}, 500
 
 
-@app.route('/upload', methods=['GET', 'POST'])
+def merge_summary(counts):
+    return f"新增 {counts['inserted']} 筆、更新 {counts['updated']} 筆、未變更 {counts['unchanged']} 筆"
+
+
+@bp.route('/upload', methods=['GET', 'POST'])
 def upload_excel():
     if request.method == 'POST':
         file1 = request.files.get('體檢表')
         file2 = request.files.get('巡查表')
+        mode = request.form.get('mode', 'replace')  # replace：整表取代；merge：依 key 合併
+
+        if not file1 and not file2:
+            flash("⚠️ 請至少上傳一份 Excel 檔", "warning")
+            return redirect(url_for('.upload_excel'))
 
         try:
             msg_list = []
-            if file1:
-                df1 = pd.read_excel(file1)
-                df1.to_sql('structures', engine, if_exists='replace', index=False)
-                msg_list.append("✅ 體檢表更新成功")
-
-            if file2:
-                df2 = pd.read_excel(file2)
-                df2.to_sql('inspection_table', engine, if_exists='replace', index=False)
-                msg_list.append("✅ 巡查表更新成功")
-
-            if not msg_list:
-                flash("⚠️ 請至少上傳一份 Excel 檔", "warning")
-                return redirect(url_for('upload_excel'))
-
-            flash("、".join(msg_list), "success")
-
+            # 兩份資料表與更新時間在同一個交易中寫入，失敗時整批還原
             with engine.begin() as conn:
+                if file1 and mode == 'merge':
+                    counts = merge_table(conn, file1, 'structures', STRUCTURE_KEY, primary_key="FID",
+                                         indexes=STRUCTURE_INDEXES,
+                                         before_delete=delete_structure_index_rows,
+                                         after_insert=insert_structure_index_rows)
+                    if not table_column_types(conn, FTS_TABLE):
+                        rebuild_search_index(conn, table_column_types(conn, 'structures'))
+                    if not table_column_types(conn, RTREE_TABLE):
+                        rebuild_spatial_index(conn)
+                    msg_list.append("✅ 體檢表合併成功（" + merge_summary(counts) + "）")
+                elif file1:
+                    columns, _ = replace_table(conn, file1, 'structures', primary_key="FID", indexes=STRUCTURE_INDEXES)
+                    rebuild_search_index(conn, columns)
+                    rebuild_spatial_index(conn)
+                    msg_list.append("✅ 體檢表更新成功")
+
+                if file2 and mode == 'merge':
+                    counts = merge_table(conn, file2, 'inspection_table', INSPECTION_KEY, indexes=INSPECTION_INDEXES)
+                    msg_list.append("✅ 巡查表合併成功（" + merge_summary(counts) + "）")
+                elif file2:
+                    replace_table(conn, file2, 'inspection_table', indexes=INSPECTION_INDEXES)
+                    msg_list.append("✅ 巡查表更新成功")
+
                 conn.execute(text("REPLACE INTO meta (key, value) VALUES ('last_update', :val)"),
                             {"val": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
-            return redirect(url_for('index'))  # 跳回主頁
+                conn.execute(text("REPLACE INTO meta (key, value) VALUES ('data_version', :val)"),
+                            {"val": uuid.uuid4().hex})
+            metadata_cache.invalidate()
+
+            flash("、".join(msg_list), "success")
+            return redirect(url_for('.index'))  # 跳回主頁
 
         except Exception as e:
             flash(f"❌ 上傳失敗：{str(e)}", "danger")
-            return redirect(url_for('upload_excel'))
+            return redirect(url_for('.upload_excel'))
 
     return render_template('upload.html')
 
+
 if __name__ == '__main__':
+    # 開發用伺服器；正式環境請以 WSGI 伺服器執行 create_app()，見 README
     port = int(os.environ.get("PORT", 5000))
-    app.run(debug=True, host='0.0.0.0', port=port)
+    create_app().run(debug=True, host='0.0.0.0', port=port)
 
 
 